@@ -30,7 +30,7 @@
 
 import datetime
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple, Union
 
 import FreeCAD
 import Path.Base.Util as PathUtil
@@ -42,6 +42,9 @@ import Path.Tool.Controller as PathToolController
 Gcode = List[str]
 Values = Dict[str, Any]
 
+# The command that turns on each coolant mode
+COOLANT_ON_COMMANDS: Dict[str, str] = {"Flood": "M8", "Mist": "M7"}
+
 
 def check_canned_cycles(values: Values) -> None:
     """Check canned cycles for drilling."""
@@ -52,6 +55,22 @@ def check_canned_cycles(values: Values) -> None:
             values["SUPPRESS_COMMANDS"] += ["G99", "G98", "G80"]
 
 
+def find_startup_command(startup: str, commands: Tuple[str, ...]) -> str:
+    """Return the first of the commands found in the joined PREAMBLE and SAFETYBLOCK."""
+    command: str
+
+    for command in commands:
+        if command in startup:
+            return command
+    return ""
+
+
+def join_startup_blocks(values: Values) -> str:
+    """Join the PREAMBLE and SAFETYBLOCK so that they can be searched together."""
+    # a newline cannot be part of a command, so no match can span the two blocks
+    return f'{values["PREAMBLE"]}\n{values["SAFETYBLOCK"]}'
+
+
 def output_coolant_off(values: Values, gcode: Gcode, coolant_mode: str) -> None:
     """Output the commands to turn coolant off if necessary."""
     comment: str
@@ -65,61 +84,57 @@ def output_coolant_off(values: Values, gcode: Gcode, coolant_mode: str) -> None:
 
 def output_coolant_on(values: Values, gcode: Gcode, coolant_mode: str) -> None:
     """Output the commands to turn coolant on if necessary."""
+    command: str
     comment: str
 
     if values["ENABLE_COOLANT"]:
         if values["OUTPUT_COMMENTS"] and coolant_mode != "None":
             comment = PostUtilsParse.create_comment(values, f"Coolant On: {coolant_mode}")
             gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-        if coolant_mode == "Flood":
-            gcode.append(f"{PostUtilsParse.linenumber(values)}M8")
-        elif coolant_mode == "Mist":
-            gcode.append(f"{PostUtilsParse.linenumber(values)}M7")
+        command = COOLANT_ON_COMMANDS.get(coolant_mode, "")
+        if command:
+            gcode.append(f"{PostUtilsParse.linenumber(values)}{command}")
 
 
 def output_end_bcnc(values: Values, gcode: Gcode) -> None:
     """Output the ending BCNC header."""
-    comment: str
-
     if values["OUTPUT_BCNC"]:
-        comment = PostUtilsParse.create_comment(values, "Block-name: post_amble")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-        comment = PostUtilsParse.create_comment(values, "Block-expand: 0")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-        comment = PostUtilsParse.create_comment(values, "Block-enable: 1")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
+        PostUtilsParse.output_comment_lines(
+            values, gcode, ("Block-name: post_amble", "Block-expand: 0", "Block-enable: 1")
+        )
 
 
 def output_header(values: Values, gcode: Gcode) -> None:
     """Output the header."""
     cam_file: str
-    comment: str
 
     if not values["OUTPUT_HEADER"]:
         return
-    comment = PostUtilsParse.create_comment(values, "Exported by FreeCAD")
-    gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-    comment = PostUtilsParse.create_comment(
-        values, f'Post Processor: {values["POSTPROCESSOR_FILE_NAME"]}'
-    )
-    gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
     if FreeCAD.ActiveDocument:
         cam_file = os.path.basename(FreeCAD.ActiveDocument.FileName)
     else:
         cam_file = "<None>"
-    comment = PostUtilsParse.create_comment(values, f"Cam File: {cam_file}")
-    gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-    comment = PostUtilsParse.create_comment(values, f"Output Time: {str(datetime.datetime.now())}")
-    gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
+    PostUtilsParse.output_comment_lines(
+        values,
+        gcode,
+        (
+            "Exported by FreeCAD",
+            f'Post Processor: {values["POSTPROCESSOR_FILE_NAME"]}',
+            f"Cam File: {cam_file}",
+            f"Output Time: {datetime.datetime.now()}",
+        ),
+    )
 
 
-def output_motion_mode(values: Values, gcode: Gcode) -> None:
+def output_motion_mode(values: Values, gcode: Gcode, startup: Union[str, None] = None) -> None:
     """Verify if PREAMBLE or SAFETYBLOCK have changed MOTION_MODE."""
+    command: str
 
-    if "G90" in values["PREAMBLE"] or "G90" in values["SAFETYBLOCK"]:
-        values["MOTION_MODE"] = "G90"
-    elif "G91" in values["PREAMBLE"] or "G91" in values["SAFETYBLOCK"]:
-        values["MOTION_MODE"] = "G91"
+    if startup is None:
+        startup = join_startup_blocks(values)
+    command = find_startup_command(startup, ("G90", "G91"))
+    if command:
+        values["MOTION_MODE"] = command
     else:
         gcode.append(f'{PostUtilsParse.linenumber(values)}{values["MOTION_MODE"]}')
 
@@ -135,65 +150,50 @@ def output_postamble_header(values: Values, gcode: Gcode) -> None:
 
 def output_postamble(values: Values, gcode: Gcode) -> None:
     """Output the postamble."""
-    line: str
-
-    for line in values["POSTAMBLE"].splitlines(False):
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{line}")
+    PostUtilsParse.output_lines(values, gcode, values["POSTAMBLE"])
 
 
 def output_postop(values: Values, gcode: Gcode, obj) -> None:
     """Output the post-operation information."""
     comment: str
-    line: str
+    text: str
 
     if values["OUTPUT_COMMENTS"]:
+        text = f'{values["FINISH_LABEL"]} operation'
         if values["SHOW_OPERATION_LABELS"]:
-            comment = PostUtilsParse.create_comment(
-                values, f'{values["FINISH_LABEL"]} operation: {obj.Label}'
-            )
-        else:
-            comment = PostUtilsParse.create_comment(values, f'{values["FINISH_LABEL"]} operation')
+            text = f"{text}: {obj.Label}"
+        comment = PostUtilsParse.create_comment(values, text)
         gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-    for line in values["POST_OPERATION"].splitlines(False):
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{line}")
+    PostUtilsParse.output_lines(values, gcode, values["POST_OPERATION"])
 
 
 def output_preamble(values: Values, gcode: Gcode) -> None:
     """Output the preamble."""
     comment: str
-    line: str
 
     if values["OUTPUT_COMMENTS"]:
         comment = PostUtilsParse.create_comment(values, "Begin preamble")
         gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-    for line in values["PREAMBLE"].splitlines(False):
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{line}")
+    PostUtilsParse.output_lines(values, gcode, values["PREAMBLE"])
 
 
 def output_preop(values: Values, gcode: Gcode, obj) -> None:
     """Output the pre-operation information."""
-    comment: str
-    line: str
+    comments: List[str]
+    unit_speed_format: str
 
     if values["OUTPUT_COMMENTS"]:
+        unit_speed_format = values["UNIT_SPEED_FORMAT"]
         if values["SHOW_OPERATION_LABELS"]:
-            comment = PostUtilsParse.create_comment(values, f"Begin operation: {obj.Label}")
+            comments = [f"Begin operation: {obj.Label}"]
         else:
-            comment = PostUtilsParse.create_comment(values, "Begin operation")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
+            comments = ["Begin operation"]
         if values["SHOW_MACHINE_UNITS"]:
-            comment = PostUtilsParse.create_comment(
-                values, f'Machine units: {values["UNIT_SPEED_FORMAT"]}'
-            )
-            gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
+            comments.append(f"Machine units: {unit_speed_format}")
         if values["OUTPUT_MACHINE_NAME"]:
-            comment = PostUtilsParse.create_comment(
-                values,
-                f'Machine: {values["MACHINE_NAME"]}, {values["UNIT_SPEED_FORMAT"]}',
-            )
-            gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-    for line in values["PRE_OPERATION"].splitlines(False):
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{line}")
+            comments.append(f'Machine: {values["MACHINE_NAME"]}, {unit_speed_format}')
+        PostUtilsParse.output_comment_lines(values, gcode, comments)
+    PostUtilsParse.output_lines(values, gcode, values["PRE_OPERATION"])
 
 
 def output_return_to(values: Values, gcode: Gcode) -> None:
@@ -215,23 +215,15 @@ def output_return_to(values: Values, gcode: Gcode) -> None:
 
 def output_safetyblock(values: Values, gcode: Gcode) -> None:
     """Output the safety block."""
-    line: str
-
-    for line in values["SAFETYBLOCK"].splitlines(False):
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{line}")
+    PostUtilsParse.output_lines(values, gcode, values["SAFETYBLOCK"])
 
 
 def output_start_bcnc(values: Values, gcode: Gcode, obj) -> None:
     """Output the starting BCNC header."""
-    comment: str
-
     if values["OUTPUT_BCNC"]:
-        comment = PostUtilsParse.create_comment(values, f"Block-name: {obj.Label}")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-        comment = PostUtilsParse.create_comment(values, "Block-expand: 0")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
-        comment = PostUtilsParse.create_comment(values, "Block-enable: 1")
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
+        PostUtilsParse.output_comment_lines(
+            values, gcode, (f"Block-name: {obj.Label}", "Block-expand: 0", "Block-enable: 1")
+        )
 
 
 def output_tool_list(values: Values, gcode: Gcode, objectslist) -> None:
@@ -240,27 +232,28 @@ def output_tool_list(values: Values, gcode: Gcode, objectslist) -> None:
 
     if values["OUTPUT_COMMENTS"] and values["LIST_TOOLS_IN_PREAMBLE"]:
         for item in objectslist:
-            if hasattr(item, "Proxy") and isinstance(item.Proxy, PathToolController.ToolController):
+            if isinstance(getattr(item, "Proxy", None), PathToolController.ToolController):
                 comment = PostUtilsParse.create_comment(values, f"T{item.ToolNumber}={item.Name}")
                 gcode.append(f"{PostUtilsParse.linenumber(values)}{comment}")
 
 
 def output_tool_return(values: Values, gcode: Gcode) -> None:
     """Output the tool return block."""
-    line: str
-
-    for line in values["TOOLRETURN"].splitlines(False):
-        gcode.append(f"{PostUtilsParse.linenumber(values)}{line}")
+    PostUtilsParse.output_lines(values, gcode, values["TOOLRETURN"])
 
 
-def output_units(values: Values, gcode: Gcode) -> None:
+def output_units(values: Values, gcode: Gcode, startup: Union[str, None] = None) -> None:
     """Verify if PREAMBLE or SAFETYBLOCK have changed UNITS."""
+    command: str
 
-    if "G21" in values["PREAMBLE"] or "G21" in values["SAFETYBLOCK"]:
+    if startup is None:
+        startup = join_startup_blocks(values)
+    command = find_startup_command(startup, ("G21", "G20"))
+    if command == "G21":
         values["UNITS"] = "G21"
         values["UNIT_FORMAT"] = "mm"
         values["UNIT_SPEED_FORMAT"] = "mm/min"
-    elif "G20" in values["PREAMBLE"] or "G20" in values["SAFETYBLOCK"]:
+    elif command == "G20":
         values["UNITS"] = "G20"
         values["UNIT_FORMAT"] = "in"
         values["UNIT_SPEED_FORMAT"] = "in/min"
@@ -276,6 +269,9 @@ def export_common(values: Values, objectslist, filename: str) -> str:
     final_for_editor: str
     gcode: Gcode = []
     editor_result: int = 1
+    output_bcnc: bool = values["OUTPUT_BCNC"]
+    output_comments: bool = values["OUTPUT_COMMENTS"]
+    startup: str
 
     for obj in objectslist:
         if not hasattr(obj, "Path"):
@@ -290,15 +286,17 @@ def export_common(values: Values, objectslist, filename: str) -> str:
     output_safetyblock(values, gcode)
     output_tool_list(values, gcode, objectslist)
     output_preamble(values, gcode)
-    output_motion_mode(values, gcode)
-    output_units(values, gcode)
+    startup = join_startup_blocks(values)
+    output_motion_mode(values, gcode, startup)
+    output_units(values, gcode, startup)
 
     for obj in objectslist:
         # Skip inactive operations
         if not PathUtil.activeForOp(obj):
             continue
         coolant_mode = PathUtil.coolantModeForOp(obj)
-        output_start_bcnc(values, gcode, obj)
+        if output_bcnc:
+            output_start_bcnc(values, gcode, obj)
         output_preop(values, gcode, obj)
         output_coolant_on(values, gcode, coolant_mode)
         # output the G-code for the group (compound) or simple path
@@ -313,24 +311,30 @@ def export_common(values: Values, objectslist, filename: str) -> str:
     # for loop.  However, that is the way that grbl post code was written, so
     # for now I will leave it that way until someone has time to figure it out.
     #
-    output_end_bcnc(values, gcode)
-    output_postamble_header(values, gcode)
+    if output_bcnc:
+        output_end_bcnc(values, gcode)
+    if output_comments:
+        output_postamble_header(values, gcode)
     output_tool_return(values, gcode)
     output_safetyblock(values, gcode)
     output_postamble(values, gcode)
 
     # add the appropriate end-of-line characters to the gcode, including after the last line
     gcode.append("")
+    # join once with "\n" (which is also what the editor works with) and convert from there
+    final_for_editor = "\n".join(gcode)
     if values["END_OF_LINE_CHARACTERS"] == "\n\n":
         # flag that we want to use "\n" as the end-of-line characters
         # by putting "\n\n" at the front of the gcode (which shouldn't otherwise happen)
-        final = "\n\n" + "\n".join(gcode)
+        final = "\n\n" + final_for_editor
+    elif values["END_OF_LINE_CHARACTERS"] == "\n":
+        # "\n" means "use the end-of-line characters that match the system"
+        final = final_for_editor
     else:
         # the other possibilities are:
-        #    "\n"   means "use the end-of-line characters that match the system"
         #    "\r"   means "use \r"
         #    "\r\n" means "use \r\n"
-        final = values["END_OF_LINE_CHARACTERS"].join(gcode)
+        final = final_for_editor.replace("\n", values["END_OF_LINE_CHARACTERS"])
 
     if FreeCAD.GuiUp and values["SHOW_EDITOR"]:
         if len(final) > 100000:
@@ -343,7 +347,6 @@ def export_common(values: Values, objectslist, filename: str) -> str:
                 if editor_result == 1:
                     final = dia.editor.toPlainText()
             else:
-                final_for_editor = "\n".join(gcode)
                 dia = PostUtils.GCodeEditorDialog(final_for_editor, refactored=True)
                 editor_result = dia.exec_()
                 if editor_result == 1:
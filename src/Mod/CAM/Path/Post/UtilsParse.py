@@ -29,14 +29,14 @@
 # *                                                                         *
 # ***************************************************************************
 
+import functools
 import math
 import re
-from typing import Any, Callable, Dict, List, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
 
 import FreeCAD
 from FreeCAD import Units
 
-import Path
 import Path.Post.Utils as PostUtils
 
 # Define some types that are used throughout this file
@@ -64,7 +64,7 @@ def check_for_an_adaptive_op(
     if values["OUTPUT_ADAPTIVE"] and adaptiveOp and command in values["RAPID_MOVES"]:
         if opHorizRapid and opVertRapid:
             return "G1"
-        command_line.append(f"(Tool Controller Rapid Values are unset)")
+        command_line.append("(Tool Controller Rapid Values are unset)")
     return ""
 
 
@@ -167,8 +167,7 @@ def check_for_tool_change(
             if values["STOP_SPINDLE_FOR_TOOL_CHANGE"]:
                 # stop the spindle
                 gcode.append(f"{linenumber(values)}M5")
-            for line in values["TOOL_CHANGE"].splitlines(False):
-                gcode.append(f"{linenumber(values)}{line}")
+            output_lines(values, gcode, values["TOOL_CHANGE"])
             return False
         if values["OUTPUT_COMMENTS"]:
             # convert the tool change to a comment
@@ -180,9 +179,12 @@ def check_for_tool_change(
 
 def create_comment(values: Values, comment_string: str) -> str:
     """Create a comment from a string using the correct comment symbol."""
-    if values["COMMENT_SYMBOL"] == "(":
+    comment_symbol: str
+
+    comment_symbol = values["COMMENT_SYMBOL"]
+    if comment_symbol == "(":
         return f"({comment_string})"
-    return values["COMMENT_SYMBOL"] + comment_string
+    return f"{comment_symbol}{comment_string}"
 
 
 def default_axis_parameter(
@@ -205,7 +207,7 @@ def default_axis_parameter(
         and math.fabs(current_location[param] - param_value) < epsilon
     ):
         return ""
-    return format_for_axis(values, Units.Quantity(param_value, Units.Length))
+    return format_for_length(values, param_value)
 
 
 def default_D_parameter(
@@ -220,7 +222,7 @@ def default_D_parameter(
     if command in ("G41", "G42"):
         return str(int(param_value))
     if command in ("G41.1", "G42.1"):
-        return format_for_axis(values, Units.Quantity(param_value, Units.Length))
+        return format_for_length(values, param_value)
     if command in ("G96", "G97"):
         return format_for_spindle(values, param_value)
     # anything else that is supported
@@ -254,18 +256,18 @@ def default_F_parameter(
     # more obvious where to put that check.
     if command in values["RAPID_MOVES"]:
         return ""
-    feed = Units.Quantity(param_value, Units.Velocity)
-    if feed.getValueAs(values["UNIT_SPEED_FORMAT"]) <= 0.0:
+    if param_value <= 0.0:
         return ""
     # if any of X, Y, Z, U, V, or W are in the parameters
     # and any of their values is different than where the device currently should be
     # then feed is in linear units
     found = False
     for key in ("X", "Y", "Z", "U", "V", "W"):
-        if key in parameters and math.fabs(current_location[key] - parameters[key]) > epsilon:
+        # written as "not <=" so that an unknown (NaN) location counts as different
+        if key in parameters and not math.fabs(current_location[key] - parameters[key]) <= epsilon:
             found = True
     if found:
-        return format_for_feed(values, feed)
+        return format_for_speed(values, param_value)
     # else if any of A, B, or C are in the parameters, the feed is in degrees,
     #     which should not be converted when in --inches mode
     found = False
@@ -274,10 +276,10 @@ def default_F_parameter(
             found = True
     if found:
         # converting from degrees per second to degrees per minute as well
-        return format(float(feed * 60.0), f'.{str(values["FEED_PRECISION"])}f')
+        return f'{param_value * 60.0:.{values["FEED_PRECISION"]}f}'
     # which leaves none of X, Y, Z, U, V, W, A, B, C,
     # which should not be valid but return a converted value just in case
-    return format_for_feed(values, feed)
+    return format_for_speed(values, param_value)
 
 
 def default_int_parameter(
@@ -301,7 +303,7 @@ def default_length_parameter(
     current_location: PathParameters,  # pylint: disable=unused-argument
 ) -> str:
     """Process a parameter that is treated like a length."""
-    return format_for_axis(values, Units.Quantity(param_value, Units.Length))
+    return format_for_length(values, param_value)
 
 
 def default_P_parameter(
@@ -318,7 +320,7 @@ def default_P_parameter(
     if command in ("G4", "G04", "G76", "G82", "G86", "G89"):
         return str(float(param_value))
     if command in ("G5", "G05", "G64"):
-        return format_for_axis(values, Units.Quantity(param_value, Units.Length))
+        return format_for_length(values, param_value)
     # anything else that is supported
     return str(param_value)
 
@@ -335,7 +337,7 @@ def default_Q_parameter(
     if command == "G10":
         return str(int(param_value))
     if command in ("G64", "G73", "G83"):
-        return format_for_axis(values, Units.Quantity(param_value, Units.Length))
+        return format_for_length(values, param_value)
     return ""
 
 
@@ -361,7 +363,7 @@ def default_rotary_parameter(
         return ""
     #  unlike other axis, rotary axis such as A, B, and C are always in degrees
     #  and should not be converted when in --inches mode
-    return str(format(float(param_value), f'.{str(values["AXIS_PRECISION"])}f'))
+    return f'{float(param_value):.{values["AXIS_PRECISION"]}f}'
 
 
 def default_S_parameter(
@@ -428,27 +430,26 @@ def drill_translate(
         # force absolute coordinates during cycles
         gcode.append(f"{linenumber(values)}G90")
 
-    drill_x = Units.Quantity(params["X"], Units.Length)
-    drill_y = Units.Quantity(params["Y"], Units.Length)
-    drill_z = Units.Quantity(params["Z"], Units.Length)
-    retract_z = Units.Quantity(params["R"], Units.Length)
+    # work with the plain (mm) floats; they are only converted when formatted
+    drill_x = params["X"]
+    drill_y = params["Y"]
+    drill_z = params["Z"]
+    retract_z = params["R"]
     if retract_z < drill_z:  # R less than Z is error
         comment = create_comment(values, "Drill cycle error: R less than Z")
         gcode.append(f"{linenumber(values)}{comment}")
         return
-    motion_z = Units.Quantity(motion_location["Z"], Units.Length)
+    motion_z = motion_location["Z"]
     if values["MOTION_MODE"] == "G91":  # relative movements
-        drill_x += Units.Quantity(motion_location["X"], Units.Length)
-        drill_y += Units.Quantity(motion_location["Y"], Units.Length)
+        drill_x += motion_location["X"]
+        drill_y += motion_location["Y"]
         drill_z += motion_z
         retract_z += motion_z
     if drill_retract_mode == "G98" and motion_z >= retract_z:
         retract_z = motion_z
 
-    cmd = format_command_line(values, ["G0", f"Z{format_for_axis(values, retract_z)}"])
-    G0_retract_z = f"{cmd}"
-    cmd = format_for_feed(values, Units.Quantity(params["F"], Units.Velocity))
-    F_feedrate = f'{values["COMMAND_SPACE"]}F{cmd}'
+    G0_retract_z = format_command_line(values, ["G0", f"Z{format_for_length(values, retract_z)}"])
+    F_feedrate = f'{values["COMMAND_SPACE"]}F{format_for_speed(values, params["F"])}'
 
     # preliminary movement(s)
     if motion_z < retract_z:
@@ -457,15 +458,15 @@ def drill_translate(
         values,
         [
             "G0",
-            f"X{format_for_axis(values, drill_x)}",
-            f"Y{format_for_axis(values, drill_y)}",
+            f"X{format_for_length(values, drill_x)}",
+            f"Y{format_for_length(values, drill_y)}",
         ],
     )
     gcode.append(f"{linenumber(values)}{cmd}")
     if motion_z > retract_z:
         # NIST GCODE 3.5.16.1 Preliminary and In-Between Motion says G0 to retract_z
         # Here use G1 since retract height may be below surface !
-        cmd = format_command_line(values, ["G1", f"Z{format_for_axis(values, retract_z)}"])
+        cmd = format_command_line(values, ["G1", f"Z{format_for_length(values, retract_z)}"])
         gcode.append(f"{linenumber(values)}{cmd}{F_feedrate}")
 
         # drill moves
@@ -486,27 +487,38 @@ def format_command_line(values: Values, command_line: CommandLine) -> str:
 
 def format_for_axis(values: Values, number) -> str:
     """Format a number using the precision for an axis value."""
-    return str(
-        format(
-            float(number.getValueAs(values["UNIT_FORMAT"])),
-            f'.{str(values["AXIS_PRECISION"])}f',
-        )
-    )
+    return f'{float(number.getValueAs(values["UNIT_FORMAT"])):.{values["AXIS_PRECISION"]}f}'
 
 
 def format_for_feed(values: Values, number) -> str:
     """Format a number using the precision for a feed rate."""
-    return str(
-        format(
-            float(number.getValueAs(values["UNIT_SPEED_FORMAT"])),
-            f'.{str(values["FEED_PRECISION"])}f',
-        )
-    )
+    return f'{float(number.getValueAs(values["UNIT_SPEED_FORMAT"])):.{values["FEED_PRECISION"]}f}'
+
+
+def format_for_length(values: Values, number: float) -> str:
+    """Format a length in internal units (mm) using the precision for an axis value.
+
+    This gives the same result as format_for_axis without creating a Quantity.
+    """
+    return f'{number / unit_divisor(values["UNIT_FORMAT"]):.{values["AXIS_PRECISION"]}f}'
+
+
+def format_for_speed(values: Values, number: float) -> str:
+    """Format a speed in internal units (mm/s) using the precision for a feed rate.
+
+    This gives the same result as format_for_feed without creating a Quantity.
+    """
+    return f'{number / unit_divisor(values["UNIT_SPEED_FORMAT"]):.{values["FEED_PRECISION"]}f}'
 
 
 def format_for_spindle(values: Values, number) -> str:
     """Format a number using the precision for a spindle speed."""
-    return str(format(float(number), f'.{str(values["SPINDLE_DECIMALS"])}f'))
+    return f'{float(number):.{values["SPINDLE_DECIMALS"]}f}'
+
+
+def format_line_number(line_num: int, space: str) -> str:
+    """Format a line number as the prefix of a line of G code."""
+    return f"N{line_num}{space}"
 
 
 def init_parameter_functions(parameter_functions: Dict[str, ParameterFunction]) -> None:
@@ -553,15 +565,15 @@ def init_parameter_functions(parameter_functions: Dict[str, ParameterFunction])
 
 def linenumber(values: Values, space: Union[str, None] = None) -> str:
     """Output the next line number if appropriate."""
-    line_num: str
+    line_num: int
 
     if not values["OUTPUT_LINE_NUMBERS"]:
         return ""
     if space is None:
         space = values["COMMAND_SPACE"]
-    line_num = str(values["line_number"])
-    values["line_number"] += values["LINE_INCREMENT"]
-    return f"N{line_num}{space}"
+    line_num = values["line_number"]
+    values["line_number"] = line_num + values["LINE_INCREMENT"]
+    return format_line_number(line_num, space)
 
 
 def output_G73_G83_drill_moves(
@@ -584,7 +596,7 @@ def output_G73_G83_drill_moves(
     next_stop_z: float
 
     last_stop_z = retract_z
-    drill_step = Units.Quantity(params["Q"], Units.Length)
+    drill_step = params["Q"]
     # NIST 3.5.16.4 G83 Cycle:  "current hole bottom, backed off a bit."
     a_bit = drill_step * 0.05
     if drill_step != 0:
@@ -594,23 +606,23 @@ def output_G73_G83_drill_moves(
                 clearance_depth = last_stop_z + a_bit
                 cmd = format_command_line(
                     values,
-                    ["G0", f"Z{format_for_axis(values, clearance_depth)}"],
+                    ["G0", f"Z{format_for_length(values, clearance_depth)}"],
                 )
                 gcode.append(f"{linenumber(values)}{cmd}")
             next_stop_z = last_stop_z - drill_step
             if next_stop_z > drill_z:
                 cmd = format_command_line(
-                    values, ["G1", f"Z{format_for_axis(values, next_stop_z)}"]
+                    values, ["G1", f"Z{format_for_length(values, next_stop_z)}"]
                 )
                 gcode.append(f"{linenumber(values)}{cmd}{F_feedrate}")
                 if command == "G73":
                     # Rapid up "a small amount".
-                    chip_breaker_height = next_stop_z + values["CHIPBREAKING_AMOUNT"]
+                    chip_breaker_height = next_stop_z + values["CHIPBREAKING_AMOUNT"].Value
                     cmd = format_command_line(
                         values,
                         [
                             "G0",
-                            f"Z{format_for_axis(values, chip_breaker_height)}",
+                            f"Z{format_for_length(values, chip_breaker_height)}",
                         ],
                     )
                     gcode.append(f"{linenumber(values)}{cmd}")
@@ -619,9 +631,13 @@ def output_G73_G83_drill_moves(
                     gcode.append(f"{linenumber(values)}{G0_retract_z}")
                 last_stop_z = next_stop_z
             else:
-                cmd = format_command_line(values, ["G1", f"Z{format_for_axis(values, drill_z)}"])
-                gcode.append(f"{linenumber(values)}{cmd}{F_feedrate}")
-                gcode.append(f"{linenumber(values)}{G0_retract_z}")
+                cmd = format_command_line(values, ["G1", f"Z{format_for_length(values, drill_z)}"])
+                gcode.extend(
+                    (
+                        f"{linenumber(values)}{cmd}{F_feedrate}",
+                        f"{linenumber(values)}{G0_retract_z}",
+                    )
+                )
                 break
 
 
@@ -637,7 +653,7 @@ def output_G81_G82_drill_moves(
     """Output the movement G code for G81 and G82."""
     cmd: str
 
-    cmd = format_command_line(values, ["G1", f"Z{format_for_axis(values, drill_z)}"])
+    cmd = format_command_line(values, ["G1", f"Z{format_for_length(values, drill_z)}"])
     gcode.append(f"{linenumber(values)}{cmd}{F_feedrate}")
     # pause where applicable
     if command == "G82":
@@ -646,24 +662,55 @@ def output_G81_G82_drill_moves(
     gcode.append(f"{linenumber(values)}{G0_retract_z}")
 
 
+def output_comment_lines(values: Values, gcode: Gcode, texts: Iterable[str]) -> None:
+    """Output each of the texts as a comment on its own line."""
+    gcode.extend([f"{linenumber(values)}{create_comment(values, text)}" for text in texts])
+
+
+def output_lines(values: Values, gcode: Gcode, text: str) -> None:
+    """Output a multi-line value (such as the PREAMBLE) one line at a time."""
+    increment: int
+    line: str
+    line_num: int
+    space: str
+
+    if values["OUTPUT_LINE_NUMBERS"]:
+        # same numbering as linenumber(), counted locally and stored once
+        increment = values["LINE_INCREMENT"]
+        line_num = values["line_number"]
+        space = values["COMMAND_SPACE"]
+        for line in split_lines(text):
+            gcode.append(f"{format_line_number(line_num, space)}{line}")
+            line_num += increment
+        values["line_number"] = line_num
+    else:
+        gcode.extend(split_lines(text))
+
+
 def parse_a_group(values: Values, gcode: Gcode, pathobj) -> None:
     """Parse a Group (compound, project, or simple path)."""
     comment: str
-
-    if hasattr(pathobj, "Group"):  # We have a compound or project.
-        if values["OUTPUT_COMMENTS"]:
-            comment = create_comment(values, f"Compound: {pathobj.Label}")
-            gcode.append(f"{linenumber(values)}{comment}")
-        for p in pathobj.Group:
-            parse_a_group(values, gcode, p)
-    else:  # parsing simple path
-        # groups might contain non-path things like stock.
-        if not hasattr(pathobj, "Path"):
-            return
-        if values["OUTPUT_PATH_LABELS"] and values["OUTPUT_COMMENTS"]:
-            comment = create_comment(values, f"Path: {pathobj.Label}")
-            gcode.append(f"{linenumber(values)}{comment}")
-        parse_a_path(values, gcode, pathobj)
+    output_comments: bool = values["OUTPUT_COMMENTS"]
+    output_path_labels: bool = values["OUTPUT_PATH_LABELS"] and output_comments
+    # walk nested groups with an explicit stack instead of recursing
+    stack: List = [pathobj]
+
+    while stack:
+        pathobj = stack.pop()
+        if hasattr(pathobj, "Group"):  # We have a compound or project.
+            if output_comments:
+                comment = create_comment(values, f"Compound: {pathobj.Label}")
+                gcode.append(f"{linenumber(values)}{comment}")
+            # push the members in reverse so that they are parsed in order
+            stack.extend(reversed(pathobj.Group))
+        else:  # parsing simple path
+            # groups might contain non-path things like stock.
+            if not hasattr(pathobj, "Path"):
+                continue
+            if output_path_labels:
+                comment = create_comment(values, f"Path: {pathobj.Label}")
+                gcode.append(f"{linenumber(values)}{comment}")
+            parse_a_path(values, gcode, pathobj)
 
 
 def parse_a_path(values: Values, gcode: Gcode, pathobj) -> None:
@@ -678,30 +725,30 @@ def parse_a_path(values: Values, gcode: Gcode, pathobj) -> None:
     motion_location: PathParameters = {}  # keep track of last motion location
     parameter: str
     parameter_value: str
+    params: PathParameters
+
+    # these values do not change while the path is being parsed,
+    # so look them up once instead of once per command
+    comment_symbol: str = values["COMMENT_SYMBOL"]
+    modal: bool = values["MODAL"]
+    motion_commands: List[str] = values["MOTION_COMMANDS"]
+    output_blank_lines: bool = values["OUTPUT_BLANK_LINES"]
+    output_comments: bool = values["OUTPUT_COMMENTS"]
+    parameter_functions: Dict[str, ParameterFunction] = values["PARAMETER_FUNCTIONS"]
+    # the position of each parameter in values["PARAMETER_ORDER"]
+    parameter_index: Dict[str, int] = {
+        parameter: index for index, parameter in enumerate(values["PARAMETER_ORDER"])
+    }
 
     # Check to see if values["TOOL_BEFORE_CHANGE"] is set and value is true
     # doing it here to reduce the number of times it is checked
     swap_tool_change_order = False
     if "TOOL_BEFORE_CHANGE" in values and values["TOOL_BEFORE_CHANGE"]:
         swap_tool_change_order = True
+    # the starting location is unknown; NaN never compares
+    # as "close enough" to any real first parameter value
     current_location.update(
-        # the goal is to have initial values that aren't likely to match
-        # any "real" first parameter values
-        Path.Command(
-            "G0",
-            {
-                "X": 123456789.0,
-                "Y": 123456789.0,
-                "Z": 123456789.0,
-                "U": 123456789.0,
-                "V": 123456789.0,
-                "W": 123456789.0,
-                "A": 123456789.0,
-                "B": 123456789.0,
-                "C": 123456789.0,
-                "F": 123456789.0,
-            },
-        ).Parameters
+        dict.fromkeys(("X", "Y", "Z", "U", "V", "W", "A", "B", "C", "F"), math.nan)
     )
     adaptive_op_variables = determine_adaptive_op(values, pathobj)
 
@@ -712,18 +759,20 @@ def parse_a_path(values: Values, gcode: Gcode, pathobj) -> None:
 
     for c in path_to_process.Commands:
         command = c.Name
+        # c.Parameters builds a new dictionary on every access
+        params = c.Parameters
         command_line = []
 
         # Skip blank lines if requested
         if not command:
-            if not values["OUTPUT_BLANK_LINES"]:
+            if not output_blank_lines:
                 continue
 
         # Modify the command name if necessary
         if command.startswith("("):
-            if not values["OUTPUT_COMMENTS"]:
+            if not output_comments:
                 continue
-            if values["COMMENT_SYMBOL"] != "(" and len(command) > 2:
+            if comment_symbol != "(" and len(command) > 2:
                 command = create_comment(values, command[1:-1])
 
         cmd = check_for_an_adaptive_op(values, command, command_line, adaptive_op_variables)
@@ -732,43 +781,45 @@ def parse_a_path(values: Values, gcode: Gcode, pathobj) -> None:
         # Add the command name to the command line
         command_line.append(command)
         # if modal: suppress the command if it is the same as the last one
-        if values["MODAL"] and command == lastcommand:
+        if modal and command == lastcommand:
             command_line.pop(0)
 
-        # Now add the remaining parameters in order
-        for parameter in values["PARAMETER_ORDER"]:
-            if parameter in c.Parameters:
-                parameter_value = values["PARAMETER_FUNCTIONS"][parameter](
-                    values,
-                    command,
-                    parameter,
-                    c.Parameters[parameter],
-                    c.Parameters,
-                    current_location,
-                )
-                if parameter_value:
-                    command_line.append(f"{parameter}{parameter_value}")
+        # Now add the remaining parameters in order, only looking
+        # at the (few) parameters that the command actually has
+        for parameter in sorted(
+            [p for p in params if p in parameter_index], key=parameter_index.__getitem__
+        ):
+            parameter_value = parameter_functions[parameter](
+                values,
+                command,
+                parameter,
+                params[parameter],
+                params,
+                current_location,
+            )
+            if parameter_value:
+                command_line.append(f"{parameter}{parameter_value}")
 
-        set_adaptive_op_speed(values, command, command_line, c.Parameters, adaptive_op_variables)
+        set_adaptive_op_speed(values, command, command_line, params, adaptive_op_variables)
         # Remember the current command
         lastcommand = command
         # Remember the current location
-        current_location.update(c.Parameters)
+        current_location.update(params)
         if command in ("G90", "G91"):
             # Remember the motion mode
             values["MOTION_MODE"] = command
         elif command in ("G98", "G99"):
             # Remember the drill retract mode for drill_translate
             drill_retract_mode = command
-        if command in values["MOTION_COMMANDS"]:
+        if command in motion_commands:
             # Remember the current location for drill_translate
-            motion_location.update(c.Parameters)
+            motion_location.update(params)
         if check_for_drill_translate(
             values,
             gcode,
             command,
             command_line,
-            c.Parameters,
+            params,
             motion_location,
             drill_retract_mode,
         ):
@@ -793,7 +844,7 @@ def parse_a_path(values: Values, gcode: Gcode, pathobj) -> None:
                 # Add a line number to the front of the command line
                 gcode.append(f"{linenumber(values)}{format_command_line(values, command_line)}")
 
-        check_for_tlo(values, gcode, command, c.Parameters)
+        check_for_tlo(values, gcode, command, params)
         check_for_machine_specific_commands(values, gcode, command)
 
 
@@ -823,3 +874,22 @@ def set_adaptive_op_speed(
         else:
             param_num = format_for_feed(values, opVertRapid)
         command_line.append(f"F{param_num}")
+
+
+@functools.lru_cache(maxsize=32)
+def split_lines(text: str) -> Tuple[str, ...]:
+    """Split a multi-line value (such as the PREAMBLE) into its lines.
+
+    The result is cached, so a value that does not change
+    is only split once no matter how often it is output.
+    """
+    return tuple(text.splitlines(False))
+
+
+@functools.lru_cache(maxsize=None)
+def unit_divisor(unit: str) -> float:
+    """Return the value of one unit (such as "in" or "mm/min") in internal units.
+
+    Dividing an internal value by this is what Quantity.getValueAs(unit) does.
+    """
+    return Units.Quantity(f"1 {unit}").Value
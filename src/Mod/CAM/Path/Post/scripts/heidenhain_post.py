@@ -134,6 +134,9 @@ LINENUMBER_INCREMENT = 1  # line number increment
 #                   GCODE VARIABLES AND FUNCTIONS                          #
 
 POSTGCODE = []  # Output string array
+COMMAND_ALIASES = {f"G0{d}": f"G{d}" for d in range(10)}  # G00 -> G0, G01 -> G1 ...
+COMMAND_ALIASES.update({f"M0{d}": f"M{d}" for d in range(10)})  # M03 -> M3, M06 -> M6 ...
+MODAL_COMMANDS = {"G90": "G91", "G91": "G90", "G98": "G99", "G99": "G98"}  # cancels the other
 G_FUNCTION_STORE = {
     "G90": False,
     "G91": False,
@@ -147,6 +150,13 @@ G_FUNCTION_STORE = {
 #                     HEIDENHAIN MACHINE PARAMETERS                        #
 
 MACHINE_WORK_AXIS = 2  # 0=X ; 1=Y ; 2=Z usually Z
+MACHINE_AXES = ("X", "Y", "Z")  # indexed by MACHINE_WORK_AXIS
+MACHINE_CENTER_AXES = ("I", "J", "K")  # arc center offsets matching MACHINE_AXES
+MACHINE_WORK_PLANES = (  # arc plane axes and tool axis, indexed by MACHINE_WORK_AXIS
+    ("Y", "Z", "X"),  # tool on X axis
+    ("X", "Z", "Y"),  # tool on Y axis
+    ("X", "Y", "Z"),  # tool on Z axis
+)
 MACHINE_SPINDLE_DIRECTION = 3  # CW = 3 ; CCW = 4
 MACHINE_LAST_POSITION = {  # axis initial values to overwrite
     "X": 99999,
@@ -163,6 +173,7 @@ MACHINE_LAST_CENTER = {  # CC initial values to overwrite
 }
 MACHINE_TRASL_ROT = [0, 0, 0, 0]  # [X, Y, Z , Angle] !not implemented
 MACHINE_STORED_PARAMS = ["", -1, ""]  # Store R F M parameter to skip
+DRILL_RAPID = ""  # R F M words of drill rapid movements, set by processArguments
 
 #                  POSTPROCESSOR VARIABLES STORAGE                         #
 
@@ -257,6 +268,7 @@ def processArguments(argstring):
     global FIRST_LBL
     global SHOW_EDITOR
     global SKIP_WARNS
+    global DRILL_RAPID
 
     try:
         args = parser.parse_args(shlex.split(argstring))
@@ -285,6 +297,18 @@ def processArguments(argstring):
     except Exception:
         return False
 
+    # the rapid words of drill cycles only depend on the options above
+    if MACHINE_USE_FMAX:
+        if MACHINE_SKIP_PARAMS:
+            DRILL_RAPID = " FMAX"
+        else:
+            DRILL_RAPID = " R0 FMAX M"
+    else:
+        if MACHINE_SKIP_PARAMS:
+            DRILL_RAPID = HEIDEN_Format(" F", FEED_MAX_SPEED)
+        else:
+            DRILL_RAPID = " R0" + HEIDEN_Format(" F", FEED_MAX_SPEED) + " M"
+
     return True
 
 
@@ -305,24 +329,6 @@ def export(objectslist, filename, argstring):
     Feed = 0
     Spindle_Active = False
     Compensation = "0"
-    params = [
-        "X",
-        "Y",
-        "Z",
-        "A",
-        "B",
-        "C",
-        "I",
-        "J",
-        "K",
-        "F",
-        "H",
-        "S",
-        "T",
-        "Q",
-        "R",
-        "L",
-    ]
 
     for obj in objectslist:
         if not hasattr(obj, "Path"):
@@ -332,6 +338,9 @@ def export(objectslist, filename, argstring):
             return
 
     POSTGCODE.append(HEIDEN_Begin(objectslist))  # add header
+    # bound once, called for nearly every command; POSTGCODE is only ever
+    # modified in place (LBL replacement too), so this stays valid
+    Gcode_Append = POSTGCODE.append
 
     for obj in objectslist:
         Cmd_Count = 0  # command line number
@@ -339,22 +348,23 @@ def export(objectslist, filename, argstring):
 
         if not hasattr(obj, "Proxy"):
             continue
+        Obj_Proxy = obj.Proxy
         # useful to get idea of object kind
-        if isinstance(obj.Proxy, Path.Tool.Controller.ToolController):
+        if isinstance(Obj_Proxy, Path.Tool.Controller.ToolController):
             Object_Kind = "TOOL"
             # like we go to change tool position
             MACHINE_LAST_POSITION["X"] = 99999
             MACHINE_LAST_POSITION["Y"] = 99999
             MACHINE_LAST_POSITION["Z"] = 99999
-        elif isinstance(obj.Proxy, Path.Op.ProfileEdges.ObjectProfile):
+        elif isinstance(Obj_Proxy, Path.Op.ProfileEdges.ObjectProfile):
             Object_Kind = "PROFILE"
             if LBLIZE_ACTIVE:
                 LBLIZE_STAUS = True
-        elif isinstance(obj.Proxy, Path.Op.MillFace.ObjectFace):
+        elif isinstance(Obj_Proxy, Path.Op.MillFace.ObjectFace):
             Object_Kind = "FACE"
             if LBLIZE_ACTIVE:
                 LBLIZE_STAUS = True
-        elif isinstance(obj.Proxy, Path.Op.Helix.ObjectHelix):
+        elif isinstance(Obj_Proxy, Path.Op.Helix.ObjectHelix):
             Object_Kind = "HELIX"
 
         commands = PathUtils.getPathWithPlacement(obj).Commands
@@ -392,7 +402,7 @@ def export(objectslist, filename, argstring):
                 obj.UseComp = True
                 obj.recompute()
                 commands = PathUtils.getPathWithPlacement(obj).Commands
-                POSTGCODE.append("; MISSING EDGES UNABLE TO GET COMPENSATION")
+                Gcode_Append("; MISSING EDGES UNABLE TO GET COMPENSATION")
                 if not SKIP_WARNS:
                     (
                         PostUtils.editor(
@@ -423,38 +433,26 @@ def export(objectslist, filename, argstring):
                         )
                     )
                 # we can try to solve compensation
-                POSTGCODE.append("; COMPENSATION ACTIVE")
+                Gcode_Append("; COMPENSATION ACTIVE")
                 COMPENSATION_DIFF_STATUS[0] = True
 
         for c in commands:
             Cmd_Count += 1
             command = c.Name
-            if command != "G0":
-                command = command.replace("G0", "G")  # normalize: G01 -> G1
-
-            for param in params:
-                if param in c.Parameters:
-                    if param == "F":
-                        Feed = c.Parameters["F"]
+            command = COMMAND_ALIASES.get(command, command)  # normalize: G01 -> G1
+            Cmd_Params = c.Parameters  # builds a new dict on every access, get it once
 
-            if command == "G90":
-                G_FUNCTION_STORE["G90"] = True
-                G_FUNCTION_STORE["G91"] = False
+            # the feed is the only parameter kept between commands
+            if "F" in Cmd_Params:
+                Feed = Cmd_Params["F"]
 
-            if command == "G91":
-                G_FUNCTION_STORE["G91"] = True
-                G_FUNCTION_STORE["G90"] = False
-
-            if command == "G98":
-                G_FUNCTION_STORE["G98"] = True
-                G_FUNCTION_STORE["G99"] = False
-
-            if command == "G99":
-                G_FUNCTION_STORE["G99"] = True
-                G_FUNCTION_STORE["G98"] = False
+            # Absolute/incremental and drill retract modes
+            if command in MODAL_COMMANDS:
+                G_FUNCTION_STORE[command] = True
+                G_FUNCTION_STORE[MODAL_COMMANDS[command]] = False
 
             # Rapid movement
-            if command == "G0":
+            elif command == "G0":
                 Spindle_Status = ""
                 if Spindle_Active == False:  # At first rapid movement we turn on spindle
                     Spindle_Status += str(MACHINE_SPINDLE_DIRECTION)  # Activate spindle
@@ -466,41 +464,41 @@ def export(objectslist, filename, argstring):
                     else:
                         Spindle_Status += ""  # Spindle still active
                 parsedElem = HEIDEN_Line(
-                    c.Parameters, Compensation, Feed, True, Spindle_Status, Cmd_Count
+                    Cmd_Params, Compensation, Feed, True, Spindle_Status, Cmd_Count
                 )
                 if parsedElem is not None:
-                    POSTGCODE.append(parsedElem)
+                    Gcode_Append(parsedElem)
 
             # Linear movement
-            if command == "G1":
-                parsedElem = HEIDEN_Line(c.Parameters, Compensation, Feed, False, "", Cmd_Count)
+            elif command == "G1":
+                parsedElem = HEIDEN_Line(Cmd_Params, Compensation, Feed, False, "", Cmd_Count)
                 if parsedElem is not None:
-                    POSTGCODE.append(parsedElem)
+                    Gcode_Append(parsedElem)
 
             # Arc movement
-            if command == "G2" or command == "G3":
+            elif command == "G2" or command == "G3":
                 parsedElem = HEIDEN_Arc(
-                    c.Parameters, command, Compensation, Feed, False, "", Cmd_Count
+                    Cmd_Params, command, Compensation, Feed, False, "", Cmd_Count
                 )
                 if parsedElem is not None:
                     POSTGCODE.extend(parsedElem)
 
-            if command == "G80":  # Reset Canned Cycles
+            elif command == "G80":  # Reset Canned Cycles
                 G_FUNCTION_STORE["G81"] = False
                 G_FUNCTION_STORE["G82"] = False
                 G_FUNCTION_STORE["G83"] = False
 
             # Drilling, Dwell Drilling, Peck Drilling
-            if command == "G81" or command == "G82" or command == "G83":
-                parsedElem = HEIDEN_Drill(obj, c.Parameters, command, Feed)
+            elif command == "G81" or command == "G82" or command == "G83":
+                parsedElem = HEIDEN_Drill(obj, Cmd_Params, command, Feed)
                 if parsedElem is not None:
                     POSTGCODE.extend(parsedElem)
 
             # Tool change
-            if command == "M6":
+            elif command == "M6":
                 parsedElem = HEIDEN_ToolCall(obj)
                 if parsedElem is not None:
-                    POSTGCODE.append(parsedElem)
+                    Gcode_Append(parsedElem)
 
         if COMPENSATION_DIFF_STATUS[0]:  # Restore the compensation if removed
             obj.UseComp = True
@@ -541,7 +539,7 @@ def HEIDEN_Begin(ActualJob):  # use Label for program name
     #     program_id = JobParent.Label
     # else:
     #     program_id = "NEW"
-    return "BEGIN PGM {}".format(UNITS)
+    return f"BEGIN PGM {UNITS}"
 
 
 def HEIDEN_End(ActualJob):  # use Label for program name
@@ -551,7 +549,7 @@ def HEIDEN_End(ActualJob):  # use Label for program name
     #     program_id = JobParent.Label
     # else:
     #     program_id = "NEW"
-    return "END PGM {}".format(UNITS)
+    return f"END PGM {UNITS}"
 
 
 # def HEIDEN_ToolDef(tool_id, tool_length, tool_radius): # old machines don't have tool table, need tooldef list
@@ -561,7 +559,6 @@ def HEIDEN_End(ActualJob):  # use Label for program name
 def HEIDEN_ToolCall(tool_Params):
     global MACHINE_SPINDLE_DIRECTION
     global MACHINE_WORK_AXIS
-    H_Tool_Axis = ["X", "Y", "Z"]
     H_Tool_ID = "0"
     H_Tool_Speed = 0
     H_Tool_Comment = ""
@@ -585,7 +582,7 @@ def HEIDEN_ToolCall(tool_Params):
             "TOOL CALL "
             + str(H_Tool_ID)
             + " "
-            + H_Tool_Axis[MACHINE_WORK_AXIS]
+            + MACHINE_AXES[MACHINE_WORK_AXIS]
             + HEIDEN_Format(" S", H_Tool_Speed)
             + " ;"
             + str(H_Tool_Comment)
@@ -610,26 +607,38 @@ def HEIDEN_Line(line_Params, line_comp, line_feed, line_rapid, line_M_funct, Cmd
         "B": 99999,
         "C": 99999,
     }
-    H_Line = "L"
-    H_Line_Params = [["X", "Y", "Z"], ["R0", line_feed, line_M_funct]]
+    H_Line = ["L"]  # words of the line, joined with spaces at the end
+    H_Line_R = "R0"  # radius compensation
+    H_Line_F = line_feed
+    # these don't change inside the axis loop, read them once
+    H_Line_Incr = G_FUNCTION_STORE["G91"]
+    H_Line_Force = line_M_funct != ""  # with an M function print also unchanged axes
+
+    # skip repeated blocks that would not move any axis before formatting anything
+    if not H_Line_Force and all(
+        line_Params[i] == (0 if H_Line_Incr else MACHINE_LAST_POSITION[i])
+        for i in H_Line_New
+        if i in line_Params
+    ):
+        return None
 
     # check and hide duplicated axis movements, not last, update with new ones
     for i in H_Line_New:
-        if G_FUNCTION_STORE["G91"]:  # incremental
+        if H_Line_Incr:  # incremental
             H_Line_New[i] = 0
             if i in line_Params:
-                if line_Params[i] != 0 or line_M_funct != "":
-                    H_Line += " I" + HEIDEN_Format(i, line_Params[i])  # print incremental
+                if line_Params[i] != 0 or H_Line_Force:
+                    H_Line.append(f"I{HEIDEN_Format(i, line_Params[i])}")  # print incremental
             # update to absolute position
             H_Line_New[i] = MACHINE_LAST_POSITION[i] + H_Line_New[i]
         else:  # absolute
             H_Line_New[i] = MACHINE_LAST_POSITION[i]
             if i in line_Params:
-                if line_Params[i] != H_Line_New[i] or line_M_funct != "":
-                    H_Line += " " + HEIDEN_Format(i, line_Params[i])
+                if line_Params[i] != H_Line_New[i] or H_Line_Force:
+                    H_Line.append(HEIDEN_Format(i, line_Params[i]))
                     H_Line_New[i] = line_Params[i]
 
-    if H_Line == "L":  # No movements no line
+    if len(H_Line) == 1:  # No movements no line
         return None
 
     if COMPENSATION_DIFF_STATUS[0]:  # Diff from compensated ad not compensated path
@@ -637,41 +646,41 @@ def HEIDEN_Line(line_Params, line_comp, line_feed, line_rapid, line_M_funct, Cmd
             Cmd_Number -= 1  # align
             # initialize like true, set false if not same point compensated and not compensated
             i = True
-            for j in H_Line_Params[0]:
+            for j in MACHINE_AXES:
                 if j in STORED_COMPENSATED_OBJ[Cmd_Number].Parameters and j in line_Params:
                     if STORED_COMPENSATED_OBJ[Cmd_Number].Parameters[j] != line_Params[j]:
                         i = False
             if i == False:
-                H_Line_Params[1][0] = "R" + line_comp
+                H_Line_R = "R" + line_comp
         #                   we can skip this control if already in compensation
         #                   COMPENSATION_DIFF_STATUS[1] = False
         else:
-            H_Line_Params[1][0] = "R" + line_comp  # not used by now
+            H_Line_R = "R" + line_comp  # not used by now
 
     # check if we need to skip already active parameters
     # R parameter
-    if MACHINE_SKIP_PARAMS == False or H_Line_Params[1][0] != MACHINE_STORED_PARAMS[0]:
-        MACHINE_STORED_PARAMS[0] = H_Line_Params[1][0]
-        H_Line += " " + H_Line_Params[1][0]
+    if MACHINE_SKIP_PARAMS == False or H_Line_R != MACHINE_STORED_PARAMS[0]:
+        MACHINE_STORED_PARAMS[0] = H_Line_R
+        H_Line.append(H_Line_R)
 
     # F parameter (check rapid o feed)
     if line_rapid:
-        H_Line_Params[1][1] = FEED_MAX_SPEED
+        H_Line_F = FEED_MAX_SPEED
     if MACHINE_USE_FMAX and line_rapid:
-        H_Line += " FMAX"
+        H_Line.append("FMAX")
     else:
-        if MACHINE_SKIP_PARAMS == False or H_Line_Params[1][1] != MACHINE_STORED_PARAMS[1]:
-            MACHINE_STORED_PARAMS[1] = H_Line_Params[1][1]
-            H_Line += HEIDEN_Format(" F", H_Line_Params[1][1])
+        if MACHINE_SKIP_PARAMS == False or H_Line_F != MACHINE_STORED_PARAMS[1]:
+            MACHINE_STORED_PARAMS[1] = H_Line_F
+            H_Line.append(HEIDEN_Format("F", H_Line_F))
 
     # M parameter
-    if MACHINE_SKIP_PARAMS == False or H_Line_Params[1][2] != MACHINE_STORED_PARAMS[2]:
-        MACHINE_STORED_PARAMS[2] = H_Line_Params[1][2]
-        H_Line += " M" + H_Line_Params[1][2]
+    if MACHINE_SKIP_PARAMS == False or line_M_funct != MACHINE_STORED_PARAMS[2]:
+        MACHINE_STORED_PARAMS[2] = line_M_funct
+        H_Line.append(f"M{line_M_funct}")
 
     # LBLIZE check and array creation
     if LBLIZE_STAUS:
-        i = H_Line_Params[0][MACHINE_WORK_AXIS]
+        i = MACHINE_AXES[MACHINE_WORK_AXIS]
         # to skip reposition movements rapid or not
         if MACHINE_LAST_POSITION[i] == H_Line_New[i] and line_rapid == False:
             HEIDEN_LBL_Get(MACHINE_LAST_POSITION, H_Line_New[i])
@@ -682,7 +691,7 @@ def HEIDEN_Line(line_Params, line_comp, line_feed, line_rapid, line_M_funct, Cmd
     for i in H_Line_New:
         MACHINE_LAST_POSITION[i] = H_Line_New[i]
 
-    return H_Line
+    return " ".join(H_Line)
 
 
 # create a arc movement
@@ -697,11 +706,13 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
     global MACHINE_SKIP_PARAMS
     global MACHINE_USE_FMAX
     Cmd_Number -= 1
+    H_ArcIncremental = G_FUNCTION_STORE["G91"]  # read once, used twice
     H_ArcSameCenter = False
     H_ArcIncr = ""
     H_ArcCenter = "CC "
     H_ArcPoint = "C"
-    H_Arc_Params = [["X", "Y", "Z"], ["R0", arc_feed, arc_M_funct], ["I", "J", "K"]]
+    H_Arc_R = "R0"  # radius compensation
+    H_Arc_F = arc_feed
     H_Arc_CC = {"X": 99999, "Y": 99999, "Z": 99999}  # CC initial values to overwrite
     H_Arc_P_NEW = {  # end point initial values to overwrite
         "X": 99999,
@@ -710,11 +721,11 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
     }
 
     # get command values
-    if G_FUNCTION_STORE["G91"]:  # incremental
+    if H_ArcIncremental:  # incremental
         H_ArcIncr = "I"
         for i in range(0, 3):
-            a = H_Arc_Params[0][i]
-            b = H_Arc_Params[2][i]
+            a = MACHINE_AXES[i]
+            b = MACHINE_CENTER_AXES[i]
             # X Y Z
             if a in arc_Params:
                 H_Arc_P_NEW[a] = arc_Params[a]
@@ -728,8 +739,8 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
                     H_Arc_CC[a] = 0
     else:  # absolute
         for i in range(0, 3):
-            a = H_Arc_Params[0][i]
-            b = H_Arc_Params[2][i]
+            a = MACHINE_AXES[i]
+            b = MACHINE_CENTER_AXES[i]
             # X Y Z
             H_Arc_P_NEW[a] = MACHINE_LAST_POSITION[a]
             if a in arc_Params:
@@ -744,7 +755,7 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
     def Axis_Select(a, b, c, incr):
         if a in arc_Params and b in arc_Params:
             _H_ArcCenter = (
-                incr + HEIDEN_Format(a, H_Arc_CC[a]) + " " + incr + HEIDEN_Format(b, H_Arc_CC[b])
+                f"{incr}{HEIDEN_Format(a, H_Arc_CC[a])} {incr}{HEIDEN_Format(b, H_Arc_CC[b])}"
             )
             if c in arc_Params and arc_Params[c] != MACHINE_LAST_POSITION[c]:
                 # if there are 3 axis movements it need to be polar arc
@@ -759,24 +770,15 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
                 )
             else:
                 _H_ArcPoint = (
-                    " "
-                    + incr
-                    + HEIDEN_Format(a, H_Arc_P_NEW[a])
-                    + " "
-                    + incr
-                    + HEIDEN_Format(b, H_Arc_P_NEW[b])
+                    f" {incr}{HEIDEN_Format(a, H_Arc_P_NEW[a])}"
+                    f" {incr}{HEIDEN_Format(b, H_Arc_P_NEW[b])}"
                 )
             return [_H_ArcCenter, _H_ArcPoint]
         else:
             return ["", ""]
 
     # set the right work plane based on tool direction
-    if MACHINE_WORK_AXIS == 0:  # tool on X axis
-        Axis_Result = Axis_Select("Y", "Z", "X", H_ArcIncr)
-    elif MACHINE_WORK_AXIS == 1:  # tool on Y axis
-        Axis_Result = Axis_Select("X", "Z", "Y", H_ArcIncr)
-    elif MACHINE_WORK_AXIS == 2:  # tool on Z axis
-        Axis_Result = Axis_Select("X", "Y", "Z", H_ArcIncr)
+    Axis_Result = Axis_Select(*MACHINE_WORK_PLANES[MACHINE_WORK_AXIS], H_ArcIncr)
     # and fill with values
     H_ArcCenter += Axis_Result[0]
     H_ArcPoint += Axis_Result[1]
@@ -793,41 +795,41 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
         if COMPENSATION_DIFF_STATUS[1]:  # skip if already compensated
             Cmd_Number -= 1  # align
             i = True
-            for j in H_Arc_Params[0]:
+            for j in MACHINE_AXES:
                 if j in STORED_COMPENSATED_OBJ[Cmd_Number].Parameters and j in arc_Params:
                     if STORED_COMPENSATED_OBJ[Cmd_Number].Parameters[j] != arc_Params[j]:
                         i = False
             if i == False:
-                H_Arc_Params[1][0] = "R" + arc_comp
+                H_Arc_R = "R" + arc_comp
         # COMPENSATION_DIFF_STATUS[1] = False # we can skip this control if already in compensation
         else:
-            H_Arc_Params[1][0] = "R" + arc_comp  # not used by now
+            H_Arc_R = "R" + arc_comp  # not used by now
 
     # check if we need to skip already active parameters
 
     # R parameter
-    if MACHINE_SKIP_PARAMS == False or H_Arc_Params[1][0] != MACHINE_STORED_PARAMS[0]:
-        MACHINE_STORED_PARAMS[0] = H_Arc_Params[1][0]
-        H_ArcPoint += " " + H_Arc_Params[1][0]
+    if MACHINE_SKIP_PARAMS == False or H_Arc_R != MACHINE_STORED_PARAMS[0]:
+        MACHINE_STORED_PARAMS[0] = H_Arc_R
+        H_ArcPoint += f" {H_Arc_R}"
 
     # F parameter
     if arc_rapid:
-        H_Arc_Params[1][1] = FEED_MAX_SPEED
+        H_Arc_F = FEED_MAX_SPEED
     if MACHINE_USE_FMAX and arc_rapid:
         H_ArcPoint += " FMAX"
     else:
-        if MACHINE_SKIP_PARAMS == False or H_Arc_Params[1][1] != MACHINE_STORED_PARAMS[1]:
-            MACHINE_STORED_PARAMS[1] = H_Arc_Params[1][1]
-            H_ArcPoint += HEIDEN_Format(" F", H_Arc_Params[1][1])
+        if MACHINE_SKIP_PARAMS == False or H_Arc_F != MACHINE_STORED_PARAMS[1]:
+            MACHINE_STORED_PARAMS[1] = H_Arc_F
+            H_ArcPoint += HEIDEN_Format(" F", H_Arc_F)
 
     # M parameter
-    if MACHINE_SKIP_PARAMS == False or H_Arc_Params[1][2] != MACHINE_STORED_PARAMS[2]:
-        MACHINE_STORED_PARAMS[2] = H_Arc_Params[1][2]
-        H_ArcPoint += " M" + H_Arc_Params[1][2]
+    if MACHINE_SKIP_PARAMS == False or arc_M_funct != MACHINE_STORED_PARAMS[2]:
+        MACHINE_STORED_PARAMS[2] = arc_M_funct
+        H_ArcPoint += f" M{arc_M_funct}"
 
     # update values to absolute if are incremental before store
-    if G_FUNCTION_STORE["G91"]:  # incremental
-        for i in H_Arc_Params[0]:
+    if H_ArcIncremental:  # incremental
+        for i in MACHINE_AXES:
             H_Arc_P_NEW[i] = MACHINE_LAST_POSITION[i] + H_Arc_P_NEW[i]
             H_Arc_CC[i] = MACHINE_LAST_POSITION[i] + H_Arc_CC[i]
 
@@ -841,7 +843,7 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
 
     # LBLIZE check and array creation
     if LBLIZE_STAUS:
-        i = H_Arc_Params[0][MACHINE_WORK_AXIS]
+        i = MACHINE_AXES[MACHINE_WORK_AXIS]
         # to skip reposition movements
         if MACHINE_LAST_POSITION[i] == H_Arc_P_NEW[i]:
             if H_ArcSameCenter:
@@ -852,7 +854,7 @@ def HEIDEN_Arc(arc_Params, arc_direction, arc_comp, arc_feed, arc_rapid, arc_M_f
             HEIDEN_LBL_Get()
 
     # update machine position with new values
-    for i in H_Arc_Params[0]:
+    for i in MACHINE_AXES:
         MACHINE_LAST_CENTER[i] = H_Arc_CC[i]
         MACHINE_LAST_POSITION[i] = H_Arc_P_NEW[i]
 
@@ -894,9 +896,7 @@ def HEIDEN_PolarArc(pol_cc_X, pol_cc_Y, pol_X, pol_Y, pol_Z, pol_Axis, pol_Incr)
         if pol_Angle < 0:
             pol_Angle = pol_Angle + 360
 
-    pol_Result = (
-        "P" + HEIDEN_Format(" PA+", pol_Angle) + " " + pol_Incr + HEIDEN_Format(pol_Axis, pol_Z)
-    )
+    pol_Result = f"P{HEIDEN_Format(' PA+', pol_Angle)} {pol_Incr}{HEIDEN_Format(pol_Axis, pol_Z)}"
 
     return pol_Result
 
@@ -904,7 +904,7 @@ def HEIDEN_PolarArc(pol_cc_X, pol_cc_Y, pol_X, pol_Y, pol_Z, pol_Axis, pol_Incr)
 def HEIDEN_Drill(
     drill_Obj, drill_Params, drill_Type, drill_feed
 ):  # create a drill cycle and movement
-    global FEED_MAX_SPEED
+    global DRILL_RAPID
     global MACHINE_WORK_AXIS
     global MACHINE_LAST_POSITION
     global MACHINE_USE_FMAX
@@ -951,17 +951,8 @@ def HEIDEN_Drill(
     if "Q" in drill_Params:
         drill_Defs["INCR"] = drill_Params["Q"]
 
-    # set the parameters for rapid movements
-    if MACHINE_USE_FMAX:
-        if MACHINE_SKIP_PARAMS:
-            drill_Rapid = " FMAX"
-        else:
-            drill_Rapid = " R0 FMAX M"
-    else:
-        if MACHINE_SKIP_PARAMS:
-            drill_Rapid = HEIDEN_Format(" F", FEED_MAX_SPEED)
-        else:
-            drill_Rapid = " R0" + HEIDEN_Format(" F", FEED_MAX_SPEED) + " M"
+    # the parameters for rapid movements
+    drill_Rapid = DRILL_RAPID
 
     # move to drill location
     drill_Movement = "L"
@@ -969,7 +960,7 @@ def HEIDEN_Drill(
         # update Z value to R + actual_Z if first call
         if G_FUNCTION_STORE[drill_Type] == False:
             MACHINE_LAST_POSITION["Z"] = drill_Defs["DIST"] + MACHINE_LAST_POSITION["Z"]
-            drill_Movement = "L" + HEIDEN_Format(" Z", MACHINE_LAST_POSITION["Z"]) + drill_Rapid
+            drill_Movement = f"L{HEIDEN_Format(' Z', MACHINE_LAST_POSITION['Z'])}{drill_Rapid}"
             drill_Output.append(drill_Movement)
 
         # update X and Y position
@@ -984,7 +975,7 @@ def HEIDEN_Drill(
     else:  # not incremental
         # check if R is higher than actual Z and move if needed
         if drill_SafePoint > MACHINE_LAST_POSITION["Z"]:
-            drill_Movement = "L" + HEIDEN_Format(" Z", drill_SafePoint) + drill_Rapid
+            drill_Movement = f"L{HEIDEN_Format(' Z', drill_SafePoint)}{drill_Rapid}"
             drill_Output.append(drill_Movement)
             MACHINE_LAST_POSITION["Z"] = drill_SafePoint
 
@@ -1000,27 +991,21 @@ def HEIDEN_Drill(
 
         # check if R is not than actual Z and move if needed
         if drill_SafePoint != MACHINE_LAST_POSITION["Z"]:
-            drill_Movement = "L" + HEIDEN_Format(" Z", drill_SafePoint) + drill_Rapid
+            drill_Movement = f"L{HEIDEN_Format(' Z', drill_SafePoint)}{drill_Rapid}"
             drill_Output.append(drill_Movement)
             MACHINE_LAST_POSITION["Z"] = drill_SafePoint
 
-    # check if cycle is already stored
-    i = True
-    for j in drill_Defs:
-        if drill_Defs[j] != STORED_CANNED_PARAMS[j]:
-            i = False
-
-    if i == False:  # not same cycle, update and print
-        for j in drill_Defs:
-            STORED_CANNED_PARAMS[j] = drill_Defs[j]
+    # check if cycle is already stored, both dicts share the same keys
+    if drill_Defs != STORED_CANNED_PARAMS:  # not same cycle, update and print
+        STORED_CANNED_PARAMS.update(drill_Defs)
 
         # get the DEF template and replace the strings
         drill_CycleDef = MACHINE_CYCLE_DEF[1].format(
-            DIST=str("{:.3f}".format(drill_Defs["DIST"])),
-            DEPTH=str("{:.3f}".format(drill_Defs["DEPTH"])),
-            INCR=str("{:.3f}".format(drill_Defs["INCR"])),
-            DWELL=str("{:.0f}".format(drill_Defs["DWELL"])),
-            FEED=str("{:.0f}".format(drill_Defs["FEED"])),
+            DIST=f"{drill_Defs['DIST']:.3f}",
+            DEPTH=f"{drill_Defs['DEPTH']:.3f}",
+            INCR=f"{drill_Defs['INCR']:.3f}",
+            DWELL=f"{drill_Defs['DWELL']:.0f}",
+            FEED=f"{drill_Defs['FEED']:.0f}",
         )
         drill_Output.extend(drill_CycleDef.split("\n"))
 
@@ -1040,16 +1025,15 @@ def HEIDEN_Format(formatType, formatValue):
     global SPINDLE_DECIMALS
     global FEED_DECIMALS
     global AXIS_DECIMALS
-    returnString = ""
 
-    formatType = str(formatType)
-    if formatType == "S" or formatType == " S":
-        returnString = "%.*f" % (SPINDLE_DECIMALS, formatValue)
-    elif formatType == "F" or formatType == " F":
-        returnString = "%.*f" % (FEED_DECIMALS, formatValue)
+    if formatType in ("S", " S"):
+        decimals = SPINDLE_DECIMALS
+    elif formatType in ("F", " F"):
+        decimals = FEED_DECIMALS
     else:
-        returnString = "%.*f" % (AXIS_DECIMALS, formatValue)
-    return formatType + str(returnString)
+        decimals = AXIS_DECIMALS
+    # prefix and number in a single formatting operation
+    return "%s%.*f" % (formatType, decimals, formatValue)
 
 
 def HEIDEN_Numberize(GCodeStrings):  # add line numbers and concatenation
@@ -1059,11 +1043,12 @@ def HEIDEN_Numberize(GCodeStrings):  # add line numbers and concatenation
 
     if LINENUMBERS:
         linenr = STARTLINENR
-        result = ""
+        increment = LINENUMBER_INCREMENT
+        result = []
         for s in GCodeStrings:
-            result += str(linenr) + " " + s + "\n"
-            linenr += LINENUMBER_INCREMENT
-        return result
+            result.append(f"{linenr} {s}\n")
+            linenr += increment
+        return "".join(result)
     else:
         return "\n".join(GCodeStrings)
 